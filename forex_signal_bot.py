@@ -1,10 +1,13 @@
+import asyncio
 import logging
 from datetime import datetime
-import random
+from typing import NamedTuple
 import re
+import time
+from collections import OrderedDict
+from zoneinfo import ZoneInfo
 
-import pytz
-from tradingview_ta import TA_Handler, Interval
+import httpx
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, ContextTypes, filters
 
@@ -28,16 +31,38 @@ OTC_PAIRS = [p + " OTC" for p in FOREX_PAIRS]
 TIMEFRAMES_FOREX = ["1m", "5m", "15m", "30m", "1h"]  # без 5s/10s/30s для обычных пар
 TIMEFRAMES_OTC   = ["5s", "10s", "30s", "1m", "5m", "15m", "30m", "1h"]
 
-# Карта таймфреймов TradingView (секундные мапим на 1m — у TV нет 5s/10s/30s)
+# Множества для O(1)-проверок в хендлерах
+FOREX_SET = frozenset(FOREX_PAIRS)
+OTC_SET = frozenset(OTC_PAIRS)
+ALL_TFS = frozenset(TIMEFRAMES_FOREX) | frozenset(TIMEFRAMES_OTC)
+
+# Карта таймфреймов -> суффикс колонок сканера TradingView (в минутах).
+# Секундные мапим на 1m — у TV нет 5s/10s/30s
 TF_MAP = {
-    "5s":  Interval.INTERVAL_1_MINUTE,
-    "10s": Interval.INTERVAL_1_MINUTE,
-    "30s": Interval.INTERVAL_1_MINUTE,
-    "1m":  Interval.INTERVAL_1_MINUTE,
-    "5m":  Interval.INTERVAL_5_MINUTES,
-    "15m": Interval.INTERVAL_15_MINUTES,
-    "30m": Interval.INTERVAL_30_MINUTES,
-    "1h":  Interval.INTERVAL_1_HOUR,
+    "5s":  "1",
+    "10s": "1",
+    "30s": "1",
+    "1m":  "1",
+    "5m":  "5",
+    "15m": "15",
+    "30m": "30",
+    "1h":  "60",
+}
+
+# Сканер TradingView и запрашиваемая общая оценка (от -1 до 1)
+SCAN_URL = "https://scanner.tradingview.com/{screener}/scan"
+SCAN_COLUMN = "Recommend.All"
+
+# Сколько секунд считать анализ свежим (по выбранному таймфрейму)
+TTL_BY_TF = {
+    "5s":  3,
+    "10s": 5,
+    "30s": 8,
+    "1m":  10,
+    "5m":  30,
+    "15m": 60,
+    "30m": 120,
+    "1h":  300,
 }
 
 # Краткие уверенные объяснения
@@ -50,27 +75,76 @@ EXPLANATIONS = {
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Память выбора пользователя
-user_data = {}
+# Общий асинхронный HTTP-клиент для TradingView: HTTP/2 + пул keep-alive соединений.
+# User-Agent — как у tradingview-ta 3.3.0, которым бот ходил в сканер раньше
+TV_USER_AGENT = "tradingview_ta/3.3.0"
+_HTTPX = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=40),
+    timeout=10.0,
+    headers={"User-Agent": TV_USER_AGENT},
+)
+
+# Кэш анализов TradingView: (symbol, interval) -> (monotonic-время, (signal, explain))
+_analysis_cache: dict[tuple[str, str], tuple[float, tuple[str, str]]] = {}
+# По локу на ключ: одновременные промахи ждут один запрос, а не идут в TV каждый
+_analysis_locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+# Таймфреймы вне TIMEFRAMES_FOREX (секундные OTC) прогреваем, только пока их
+# запрашивали за последние PREWARM_IDLE секунд
+PREWARM_IDLE = 300
+# Потолок паузы прогрева при ошибках TradingView (экспоненциальный backoff)
+PREWARM_MAX_BACKOFF = 300
+# timeframe -> monotonic-время последнего запроса пользователем
+_tf_last_used: dict[str, float] = {}
+
+# Выбор пользователя: лежит в context.user_data["state"]
+class UserState(NamedTuple):
+    pair: str
+    otc: bool
+
+
+# Сколько пользователей держим в context.user_data; самых давних вытесняем (LRU)
+MAX_USERS = 100_000
+# user_id в порядке последнего обращения
+_user_lru: OrderedDict[int, None] = OrderedDict()
+
 
 # =============== ВСПОМОГАТЕЛЬНОЕ ===============
+_MSK = ZoneInfo("Europe/Moscow")
+
+# Статус рынка меняется не чаще раза в минуту — кэшируем [monotonic-время, closed]
+MARKET_CACHE_TTL = 30
+_market_cache = [float("-inf"), False]
+
+
 def is_market_closed() -> bool:
     """
     Рынок закрыт:
       - Сб–Вс: полностью
       - Пн–Пт: с 22:45 до 02:00 (по Europe/Moscow)
+    Результат кэшируется на MARKET_CACHE_TTL секунд.
     """
-    tz = pytz.timezone("Europe/Moscow")
-    now = datetime.now(tz)
+    now_mono = time.monotonic()
+    if now_mono - _market_cache[0] < MARKET_CACHE_TTL:
+        return _market_cache[1]
+
+    now = datetime.now(_MSK)
     weekday = now.weekday()  # 0=Пн … 6=Вс
     hour = now.hour
     minute = now.minute
 
-    if weekday in (5, 6):
-        return True
-    if (hour == 22 and minute >= 45) or (0 <= hour < 2):
-        return True
-    return False
+    closed = weekday in (5, 6) or (hour == 22 and minute >= 45) or (0 <= hour < 2)
+    _market_cache[0], _market_cache[1] = now_mono, closed
+    return closed
+
+
+def _tv_symbol(pair: str) -> str:
+    return pair.replace(" OTC", "").replace("/", "")
+
+
+# Набор пар фиксирован — считаем символы заранее
+_TV_SYMBOL = {p: _tv_symbol(p) for p in FOREX_PAIRS + OTC_PAIRS}
 
 
 def tv_symbol_from_pair(pair: str) -> str:
@@ -78,142 +152,288 @@ def tv_symbol_from_pair(pair: str) -> str:
     EUR/USD -> EURUSD (для TradingView FX_IDC)
     Для OTC: удаляем суффикс ' OTC' и тоже конвертируем.
     """
-    base = pair.replace(" OTC", "")
-    return base.replace("/", "")
+    symbol = _TV_SYMBOL.get(pair)
+    return symbol if symbol is not None else _tv_symbol(pair)
+
 
+# Как в tradingview_ta: -0.1 <= оценка <= 0.1 — NEUTRAL
+NEUTRAL_BAND = 0.1
 
-def coerce_to_buy_sell(analysis) -> str:
+
+def coerce_to_buy_sell(score: float, previous: str | None = None) -> str:
     """
-    Переводим TV 'RECOMMENDATION' в BUY/SELL.
-    Если NEUTRAL — используем рекомендации скользящих/осцилляторов, иначе эвристика.
+    Переводим общую оценку TV (Recommend.All) в BUY/SELL.
+    Если NEUTRAL — previous (прошлый сигнал по этой паре), иначе знак оценки.
     """
-    try:
-        summary = (analysis.summary.get("RECOMMENDATION") or "").upper()
-    except Exception:
-        summary = ""
-
-    if summary in ("BUY", "STRONG_BUY"):
+    if score > NEUTRAL_BAND:
         return "BUY"
-    if summary in ("SELL", "STRONG_SELL"):
+    if score < -NEUTRAL_BAND:
         return "SELL"
+    if previous:
+        return previous
+    return "BUY" if score >= 0 else "SELL"
 
-    # NEUTRAL → попробуем уточнить через подсекции
-    ma_rec = (analysis.moving_averages.get("RECOMMENDATION") or "").upper()
-    if ma_rec in ("BUY", "STRONG_BUY"):
-        return "BUY"
-    if ma_rec in ("SELL", "STRONG_SELL"):
-        return "SELL"
 
-    osc_rec = (analysis.oscillators.get("RECOMMENDATION") or "").upper()
-    if osc_rec in ("BUY", "STRONG_BUY"):
-        return "BUY"
-    if osc_rec in ("SELL", "STRONG_SELL"):
-        return "SELL"
+async def scan_multiple(screener: str, interval: str, tickers: list[str]) -> dict:
+    """
+    Один POST в сканер TradingView по всем tickers.
+    Возвращает {"EXCHANGE:SYMBOL": Recommend.All | None}.
+    """
+    payload = {
+        "symbols": {"tickers": tickers, "query": {"types": []}},
+        "columns": [f"{SCAN_COLUMN}|{interval}"],
+    }
+    response = await _HTTPX.post(SCAN_URL.format(screener=screener), json=payload)
+    response.raise_for_status()
 
-    # Если совсем равновесие — примем сторону по количеству BUY/SELL в МА
-    try:
-        ma_counts = analysis.moving_averages.get("COMPUTE") or {}
-        buy_cnt  = sum(1 for v in ma_counts.values() if str(v).upper().startswith("BUY"))
-        sell_cnt = sum(1 for v in ma_counts.values() if str(v).upper().startswith("SELL"))
-        if buy_cnt > sell_cnt:
-            return "BUY"
-        if sell_cnt > buy_cnt:
-            return "SELL"
-    except Exception:
-        pass
+    final = dict.fromkeys(tickers, None)
+    for row in response.json()["data"]:
+        final[row["s"]] = row["d"][0]
+    return final
 
-    # Последняя страховка
-    return random.choice(["BUY", "SELL"])
 
+class BatchFetcher:
+    """
+    Склеивает запросы к TradingView, пришедшие за max_wait секунд,
+    в один scan_multiple на каждый интервал.
+    Запросы разных пользователей склеиваются только при concurrent_updates
+    (см. main()): иначе PTB обрабатывает апдейты по одному и в окне всегда один запрос.
+    """
 
-def analyze_with_tradingview(pair: str, timeframe: str, is_otc: bool) -> tuple[str, str]:
+    def __init__(self, screener: str = "forex", exchange: str = "FX_IDC", max_wait: float = 0.05):
+        self.screener = screener
+        self.exchange = exchange
+        self.max_wait = max_wait
+        self.pending: dict[tuple[str, str], list[asyncio.Future]] = {}
+        self._task: asyncio.Task | None = None
+
+    async def fetch(self, symbol: str, interval: str):
+        fut = asyncio.get_running_loop().create_future()
+        self.pending.setdefault((symbol, interval), []).append(fut)
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush())
+        return await fut
+
+    async def _flush(self):
+        await asyncio.sleep(self.max_wait)
+        pending, self.pending = self.pending, {}
+        self._task = None
+
+        by_interval: dict[str, list[str]] = {}
+        for symbol, interval in pending:
+            by_interval.setdefault(interval, []).append(symbol)
+
+        await asyncio.gather(*(
+            self._fetch_interval(interval, symbols, pending)
+            for interval, symbols in by_interval.items()
+        ))
+
+    async def _fetch_interval(self, interval: str, symbols: list[str], pending: dict):
+        tickers = [f"{self.exchange}:{s}" for s in symbols]
+        try:
+            results = await scan_multiple(self.screener, interval, tickers)
+        except Exception as e:
+            for symbol in symbols:
+                for fut in pending[(symbol, interval)]:
+                    if not fut.done():
+                        fut.set_exception(e)
+            return
+
+        for symbol, ticker in zip(symbols, tickers):
+            score = results.get(ticker)
+            for fut in pending[(symbol, interval)]:
+                if fut.done():
+                    continue
+                if score is None:
+                    fut.set_exception(LookupError(f"TradingView не вернул данные по {ticker}"))
+                else:
+                    fut.set_result(score)
+
+
+_fetcher = BatchFetcher()
+
+
+def _store_analysis(key: tuple[str, str], score: float) -> tuple[str, str]:
+    """Считает сигнал по свежей оценке и кладёт его в кэш."""
+    cached = _analysis_cache.get(key)
+    signal = coerce_to_buy_sell(score, previous=cached[1][0] if cached else None)
+    result = (signal, EXPLANATIONS[signal])
+    _analysis_cache[key] = (time.monotonic(), result)
+    return result
+
+
+async def analyze_with_tradingview(pair: str, timeframe: str, is_otc: bool) -> tuple[str, str]:
     """
     Возвращает (signal, explain). Для OTC используем базовую пару как прокси.
+    Результат кэшируется на TTL_BY_TF[timeframe] секунд.
     """
+    _tf_last_used[timeframe] = time.monotonic()
     symbol = tv_symbol_from_pair(pair)
-    interval = TF_MAP.get(timeframe, Interval.INTERVAL_5_MINUTES)
+    interval = TF_MAP.get(timeframe, "5")
+    ttl = TTL_BY_TF.get(timeframe, 30)
+    key = (symbol, interval)
 
-    handler = TA_Handler(
-        symbol=symbol,
-        screener="forex",
-        exchange="FX_IDC",
-        interval=interval
-    )
-    analysis = handler.get_analysis()
-    signal = coerce_to_buy_sell(analysis)
-    explain = EXPLANATIONS[signal]
-    return signal, explain
+    cached = _analysis_cache.get(key)
+    if cached and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+
+    lock = _analysis_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        # Пока ждали лок, другой хендлер мог уже обновить кэш
+        cached = _analysis_cache.get(key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+        score = await _fetcher.fetch(symbol, interval)
+        return _store_analysis(key, score)
+
+
+def _prewarm_period(timeframes: list[str]) -> float:
+    """
+    Пауза между прогревами интервала: чуть меньше самого короткого TTL
+    среди его таймфреймов, которыми сейчас пользуются.
+    """
+    now = time.monotonic()
+    active = [
+        tf for tf in timeframes
+        if tf in TIMEFRAMES_FOREX or now - _tf_last_used.get(tf, float("-inf")) < PREWARM_IDLE
+    ]
+    return min(TTL_BY_TF[tf] for tf in active or timeframes) * 0.8
+
+
+async def _prewarm_interval(interval: str, timeframes: list[str]):
+    """Держит кэш по всем парам на interval тёплым: один пакетный запрос на обновление."""
+    symbols = list(dict.fromkeys(_TV_SYMBOL.values()))
+    tickers = [f"FX_IDC:{s}" for s in symbols]
+    failures = 0
+
+    while True:
+        try:
+            results = await scan_multiple("forex", interval, tickers)
+            for symbol, ticker in zip(symbols, tickers):
+                if results.get(ticker) is not None:
+                    _store_analysis((symbol, interval), results[ticker])
+            failures = 0
+        except Exception as e:
+            failures += 1
+            logger.warning("Не удалось прогреть кэш для интервала %s: %s", interval, e)
+
+        period = _prewarm_period(timeframes)
+        if failures:
+            # 429/недоступность TV — не долбим сканер с прежней частотой
+            period = min(period * 2 ** min(failures, 10), PREWARM_MAX_BACKOFF)
+        await asyncio.sleep(period)
+
+
+_prewarm_tasks: list[asyncio.Task] = []
+
+
+async def start_prewarmer(app: Application):
+    # Несколько таймфреймов делят один интервал (5s/10s/30s/1m -> "1") —
+    # на интервал один цикл, частота по активным таймфреймам (_prewarm_period)
+    tfs_by_interval: dict[str, list[str]] = {}
+    for tf in dict.fromkeys(TIMEFRAMES_FOREX + TIMEFRAMES_OTC):
+        tfs_by_interval.setdefault(TF_MAP[tf], []).append(tf)
+
+    for interval, timeframes in tfs_by_interval.items():
+        _prewarm_tasks.append(asyncio.create_task(_prewarm_interval(interval, timeframes)))
+
+
+async def on_shutdown(app: Application):
+    for task in _prewarm_tasks:
+        task.cancel()
+    await asyncio.gather(*_prewarm_tasks, return_exceptions=True)
+    _prewarm_tasks.clear()
+    await _HTTPX.aclose()
 
 
 def build_keyboard(rows: list[list[str]]) -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(rows, resize_keyboard=True)
 
 
+# Клавиатуры статичны — собираем один раз
+KB_MAIN = build_keyboard([["Выбрать валютную пару"], ["Обычные пары", "OTC пары"]])
+KB_FOREX = build_keyboard([[p] for p in FOREX_PAIRS] + [["Назад"]])
+KB_OTC = build_keyboard([[p] for p in OTC_PAIRS] + [["Назад"]])
+KB_TF_FOREX = build_keyboard([[tf] for tf in TIMEFRAMES_FOREX] + [["Сменить пару", "Назад"]])
+KB_TF_OTC = build_keyboard([[tf] for tf in TIMEFRAMES_OTC] + [["Сменить пару", "Назад"]])
+KB_MARKET_CLOSED = build_keyboard([["OTC пары", "Назад"]])
+
+
 # =============== ХЕНДЛЕРЫ ===============
+def _touch_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отмечает обращение пользователя и вытесняет самых давних сверх MAX_USERS."""
+    uid = update.effective_user.id
+    _user_lru[uid] = None
+    _user_lru.move_to_end(uid)
+    while len(_user_lru) > MAX_USERS:
+        old_uid, _ = _user_lru.popitem(last=False)
+        context.application.drop_user_data(old_uid)
+
+
 async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyboard = [["Выбрать валютную пару"], ["Обычные пары", "OTC пары"]]
-    await update.message.reply_text("Выбери действие:", reply_markup=build_keyboard(keyboard))
+    await update.message.reply_text("Выбери действие:", reply_markup=KB_MAIN)
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyboard = [["Выбрать валютную пару"], ["Обычные пары", "OTC пары"]]
-    await update.message.reply_text("👋 Привет! Я бот-сигнальщик. Выбери действие:", reply_markup=build_keyboard(keyboard))
+    await update.message.reply_text("👋 Привет! Я бот-сигнальщик. Выбери действие:", reply_markup=KB_MAIN)
 
 
 async def choose_forex(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyboard = [[p] for p in FOREX_PAIRS] + [["Назад"]]
-    await update.message.reply_text("Выбери валютную пару:", reply_markup=build_keyboard(keyboard))
+    await update.message.reply_text("Выбери валютную пару:", reply_markup=KB_FOREX)
 
 
 async def choose_otc(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyboard = [[p] for p in OTC_PAIRS] + [["Назад"]]
-    await update.message.reply_text("Выбери OTC пару:", reply_markup=build_keyboard(keyboard))
+    await update.message.reply_text("Выбери OTC пару:", reply_markup=KB_OTC)
 
 
 async def pair_chosen(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text
-    uid = update.message.from_user.id
-
-    if text in FOREX_PAIRS:
-        user_data[uid] = {"pair": text, "otc": False}
-        tfs = TIMEFRAMES_FOREX
-    elif text in OTC_PAIRS:
-        user_data[uid] = {"pair": text, "otc": True}
-        tfs = TIMEFRAMES_OTC
+
+    # Выбор пользователя храним в context.user_data (PTB ведёт его по user_id)
+    if text in FOREX_SET:
+        is_otc = False
+        keyboard = KB_TF_FOREX
+    elif text in OTC_SET:
+        is_otc = True
+        keyboard = KB_TF_OTC
     else:
         return
 
-    keyboard = [[tf] for tf in tfs] + [["Сменить пару", "Назад"]]
-    await update.message.reply_text(f"✅ Пара: {text}\nВыберите таймфрейм:", reply_markup=build_keyboard(keyboard))
+    _touch_user(update, context)
+    context.user_data["state"] = UserState(text, is_otc)
+
+    await update.message.reply_text(f"✅ Пара: {text}\nВыберите таймфрейм:", reply_markup=keyboard)
 
 
 async def timeframe_chosen(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    _touch_user(update, context)
+    state = context.user_data.get("state")
+
+    # Рынок закрыт → обычные пары недоступны (проверяем до всей остальной работы;
+    # state is None — пара ещё не выбрана, это обработаем ниже)
+    if state is not None and not state.otc and is_market_closed():
+        await update.message.reply_text(
+            "❌ Нет данных: рынок закрыт.\n👉 Перейти к OTC парам?",
+            reply_markup=KB_MARKET_CLOSED
+        )
+        return
+
     tf = update.message.text
-    uid = update.message.from_user.id
 
     # Проверим, что это один из известных таймфреймов
-    if tf not in TIMEFRAMES_FOREX + TIMEFRAMES_OTC:
+    if tf not in ALL_TFS:
         return
 
-    if uid not in user_data:
+    if state is None:
         await update.message.reply_text("Сначала выбери валютную пару через кнопку Start.")
         return
 
-    pair = user_data[uid]["pair"]
-    is_otc = user_data[uid]["otc"]
-
-    # Рынок закрыт → обычные пары недоступны
-    if (not is_otc) and is_market_closed():
-        keyboard = [["OTC пары", "Назад"]]
-        await update.message.reply_text(
-            "❌ Нет данных: рынок закрыт.\n👉 Перейти к OTC парам?",
-            reply_markup=build_keyboard(keyboard)
-        )
-        return
+    pair, is_otc = state
 
-    # Анализ TradingView
+    # Анализ TradingView (запросы разных пользователей склеиваются в BatchFetcher)
     try:
-        signal, short_explain = analyze_with_tradingview(pair, tf, is_otc)
+        signal, short_explain = await analyze_with_tradingview(pair, tf, is_otc)
         text = (
             f"📊 Пара: {pair}\n"
             f"⏱ Таймфрейм: {tf}\n"
@@ -235,27 +455,41 @@ async def change_pair(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await main_menu(update, context)
 
 
+# Текст кнопки -> хендлер. Один regex-фильтр на все кнопки вместо цепочки MessageHandler
+_DISPATCH = {
+    "Обычные пары": choose_forex,
+    "OTC пары": choose_otc,
+    "Назад": back,
+    "Выбрать валютную пару": main_menu,
+    "Сменить пару": change_pair,
+    **dict.fromkeys(TIMEFRAMES_FOREX + TIMEFRAMES_OTC, timeframe_chosen),
+    **dict.fromkeys(FOREX_PAIRS + OTC_PAIRS, pair_chosen),
+}
+_ROUTE = re.compile(f"^({'|'.join(map(re.escape, _DISPATCH))})$")
+
+
+async def route(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _DISPATCH[update.message.text](update, context)
+
+
 # =============== MAIN ===============
 def main():
-    app = Application.builder().token(TOKEN).build()
+    app = (
+        Application.builder()
+        .token(TOKEN)
+        # По умолчанию PTB обрабатывает апдейты строго по одному — тогда запрос
+        # к TradingView одного пользователя задерживает всех остальных
+        .concurrent_updates(16)
+        .post_init(start_prewarmer)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
 
     # Команды
     app.add_handler(CommandHandler("start", start))
 
-    # Кнопки верхнего уровня
-    app.add_handler(MessageHandler(filters.Regex("^Обычные пары$"), choose_forex))
-    app.add_handler(MessageHandler(filters.Regex("^OTC пары$"), choose_otc))
-    app.add_handler(MessageHandler(filters.Regex("^Назад$"), back))
-    app.add_handler(MessageHandler(filters.Regex("^Выбрать валютную пару$"), main_menu))
-    app.add_handler(MessageHandler(filters.Regex("^Сменить пару$"), change_pair))
-
-    # Сначала хэндлер таймфреймов (чтобы он не «съедался» обработчиком пар)
-    tf_regex = f"^({'|'.join(map(re.escape, TIMEFRAMES_FOREX + TIMEFRAMES_OTC))})$"
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & filters.Regex(tf_regex), timeframe_chosen))
-
-    # Затем хэндлер пар
-    pairs_regex = f"^({'|'.join(map(re.escape, FOREX_PAIRS + OTC_PAIRS))})$"
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & filters.Regex(pairs_regex), pair_chosen))
+    # Все кнопки: меню, таймфреймы и пары — через единый диспетчер
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & filters.Regex(_ROUTE), route))
 
     logger.info("Бот запущен...")
     app.run_polling()